@@ -2,10 +2,22 @@
 import os
 import sys
 import copy
+import time
+import errno
+import hashlib
+import weakref
+import threading
+import contextlib
 import subprocess
 
 from xml.etree import ElementTree
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
 
 def ismodule(path):
     """
@@ -35,8 +47,14 @@ class Module(object):
         self._begin_declaration_key = 'BEGIN_JUCE_MODULE_DECLARATION'
         self._end_declaration_key = 'END_JUCE_MODULE_DECLARATION'
         self._config_key = 'Config:'
-        self._options = {}
-        self._declaration = {
+        self.reload()
+
+    def reload(self):
+        """
+        Loads the module header from disk into this object.
+        """
+        options = {}
+        declaration = {
             'ID': None,
             'vendor': None,
             'version': None,
@@ -55,7 +73,9 @@ class Module(object):
         didEnterDeclaration = False
 
         # open the header to read the declaration section
-        with open(self._header) as file:
+        with _file_lock(self._header, shared=True), open(self._header) as file:
+            stamp = _FileStamp(self._header)
+
             for line in file:
                 line = line.strip()
 
@@ -78,14 +98,14 @@ class Module(object):
                         key, value = line.split(':', 1)
 
                         # copy the value into the declaration dictionary
-                        if key in self._declaration:
-                            self._declaration[key] = value.strip()
+                        if key in declaration:
+                            declaration[key] = value.strip()
 
                 # if we find the declaration of an option add
                 # a default value to the options dictionary
                 elif line.startswith('/**') and self._config_key in line:
                     key = line.split(self._config_key, 1)[1].strip()
-                    self._options[key] = None
+                    options[key] = None
                     continue
 
                 # if we find a define read its name and value
@@ -94,21 +114,28 @@ class Module(object):
 
                     # if the define has a value and the name is a key
                     # in the options dictionary, store its value
-                    if len(define) == 2 and define[0] in self._options:
-                        self._options[define[0]] = define[1]
+                    if len(define) == 2 and define[0] in options:
+                        options[define[0]] = define[1]
 
-        self._options = {k: v for k, v in self._options.items() if v in ['0', '1']}
+        options = {k: v for k, v in options.items() if v in ['0', '1']}
 
-        for key in self._declaration:
-            if self._declaration[key] is None:
+        for key in declaration:
+            if declaration[key] is None:
                 raise ValueError('Missing key: \'' + str(key) + '\'')
 
-        if dirname != self.ID:
-            raise ValueError('Module ID: \'' + self.ID + '\' does not match module dirname: \'' + dirname + '\'')
+        dirname = os.path.basename(self.path)
+        if dirname != declaration['ID']:
+            raise ValueError('Module ID: \'' + declaration['ID'] + '\' does not match module dirname: \'' + dirname + '\'')
 
-        if ' ' in self.vendor:
+        if ' ' in declaration['vendor']:
             raise ValueError('Vendor contains whitespace')
 
+        # only replace the previous values once the header is known to be
+        # valid, so that a failed reload leaves this object unchanged
+        self._options = options
+        self._declaration = declaration
+        self._stamp = stamp
+
     def __str__(self):
         return self.path
 
@@ -139,8 +166,7 @@ class Module(object):
 
     @version.setter
     def version(self, value):
-        self._declaration['version'] = value
-        self._save()
+        self._save('version', value)
 
     @property
     def name(self):
@@ -220,7 +246,18 @@ class Module(object):
         """Returns a dict of config options with default values"""
         return self._options
 
-    def _save(self):
+    def _save(self, key, value):
+        with _file_lock(self._header):
+            # reload a header changed by another writer since it was read,
+            # rather than writing its stale values back over the changes
+            if not self._stamp.matches(self._header):
+                self.reload()
+
+            self._declaration[key] = value
+            self._write()
+            self._stamp = _FileStamp(self._header)
+
+    def _write(self):
         didEnterDeclaration = False
 
         # open the header to read the declaration section
@@ -486,30 +523,58 @@ class Project(object):
         Args:
             projucer: The path to the Projucer executable binary or app bundle
                 on mac, or a *Projucer* object.
+
+        Raises:
+            IOError: If the project file has been modified since this object
+                last read or wrote it.
         """
-        self._tree.write(self.path)
+        with _file_lock(self.path):
+            if not self._stamp.matches(self.path):
+                raise IOError('\'' + self.path + '\' has been modified since it was loaded')
+
+            self._tree.write(self.path)
+            self._stamp = _FileStamp(self.path)
+
+            if projucer:
+                if not isinstance(projucer, Projucer):
+                    projucer = Projucer(projucer)
 
-        if projucer:
-            if not isinstance(projucer, Projucer):
-                projucer = Projucer(projucer)
+                projucer.resave(self.path)
 
-            projucer.resave(self.path)
+                # the resave only regenerates what was just written, so this
+                # object still reflects the project file
+                self._stamp = _FileStamp(self.path)
 
     def reset(self):
         """
         Resets the project file on disk to the state it was in when this object
         was created or *reload()* was last called.
+
+        Exporters and configurations obtained before the reset refer to the
+        discarded tree, and changes made through them are not saved.
         """
         self._tree = copy.deepcopy(self._tree_restore_point)
-        self._tree.write(self.path)
+        self._xml = self._tree.getroot()
+
+        with _file_lock(self.path):
+            self._tree.write(self.path)
+            self._stamp = _FileStamp(self.path)
 
     def reload(self):
         """
         Loads the project file from disk into this object.
+
+        Exporters and configurations obtained before the reload refer to the
+        previous tree, and changes made through them are not saved.
         """
-        self._tree = ElementTree.parse(self.path)
-        self._tree_restore_point = ElementTree.parse(self.path)
-        self._xml = self._tree.getroot()
+        with _file_lock(self.path, shared=True):
+            stamp = _FileStamp(self.path)
+            tree = ElementTree.parse(self.path)
+
+        self._tree = tree
+        self._tree_restore_point = copy.deepcopy(tree)
+        self._xml = tree.getroot()
+        self._stamp = stamp
 
 
 class Exporter(object):
@@ -571,3 +636,516 @@ class Configuration(object):
 
     def __getattr__(self, name):
         return self._xml.attrib[name]
+
+
+class ConfigurationTable(object):
+    """
+    A column oriented view of every configuration, in every exporter, of one
+    or more Projucer project files. Each row is a single configuration, the
+    *project* and *exporter* columns hold the project path and exporter format,
+    and every other column holds a configuration attribute (or **None** where
+    a configuration does not define it).
+
+    Filtering and grouping are answered from per column indexes, which are
+    built the first time a column is queried, so a query visits the distinct
+    values of a column and the matching rows rather than every configuration.
+
+    Args:
+        projects: An iterable of *Project* objects or paths to Projucer
+            project files. A file that is listed more than once is only
+            included once, using the first *Project* or path given for it.
+    """
+    def __init__(self, projects):
+        self._projects = []
+        self._project_rows = []
+        self._elements = []
+        self._columns = {'project': [], 'exporter': []}
+        self._indexes = {}
+        self._dirty = set()
+        paths = set()
+
+        for project in projects:
+            if isinstance(project, Project):
+                path = project.path
+            else:
+                path = os.path.abspath(project)
+
+            # a second Project for the same file would overwrite the first
+            # one's changes when saved
+            if path in paths:
+                continue
+            paths.add(path)
+
+            if not isinstance(project, Project):
+                project = Project(path)
+
+            self._projects.append(project)
+
+            for exporter in project.exporters:
+                for configuration in exporter.configurations:
+                    self._append(len(self._projects) - 1, exporter, configuration)
+
+        self._rows = range(len(self._elements))
+
+        # the rows of a view as a set, or None when this table has every row
+        self._row_set = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        """Yields a dict of column values for each row."""
+        for row in self._rows:
+            yield dict((name, column[row]) for name, column in self._columns.items())
+
+    @property
+    def columns(self):
+        """A list of the column names."""
+        return list(self._columns)
+
+    @property
+    def projects(self):
+        """A list of the projects that have at least one row in this table."""
+        return [self._projects[i] for i in sorted(set(self._project_rows[row] for row in self._rows))]
+
+    def column(self, name):
+        """A list of the values in the column `name`, one for each row."""
+        values = self._column(name)
+        return [values[row] for row in self._rows]
+
+    def filter(self, **criteria):
+        """
+        Returns a table containing only the rows matching all of `criteria`.
+        Each keyword names a column, and its value is either the value to
+        match, compared as a string as in *update()*, or a callable that is
+        passed each distinct value in the column and returns **True** for
+        values to keep.
+
+        e.g. ``table.filter(exporter='XCODE_MAC', name='Release',
+        optimisation=lambda value: value is not None and int(value) < 3)``
+        """
+        rows = self._row_set
+
+        for name, criterion in criteria.items():
+            index = self._index(name)
+
+            if callable(criterion):
+                matches = set()
+                for value, value_rows in index.items():
+                    if criterion(value):
+                        matches |= value_rows
+            else:
+                if criterion is not None:
+                    criterion = str(criterion)
+                matches = index.get(criterion, set())
+
+            if rows is None:
+                rows = matches
+            else:
+                rows = rows & matches
+
+        if rows is None:
+            return self._view(self._rows)
+        return self._view(rows)
+
+    def group_by(self, name):
+        """
+        Returns a dict mapping each distinct value in the column `name` to a
+        table containing the rows with that value.
+        """
+        groups = dict()
+
+        for value, value_rows in self._index(name).items():
+            if self._row_set is None:
+                matches = value_rows
+            else:
+                matches = self._row_set & value_rows
+            if matches:
+                groups[value] = self._view(matches)
+
+        return groups
+
+    def update(self, **values):
+        """
+        Sets configuration attributes on every row. Each keyword names an
+        attribute and its value is the new value, or **None** to remove the
+        attribute. Changes are kept in memory until *save()* is called.
+        """
+        for name in values:
+            if name in ('project', 'exporter'):
+                raise ValueError('Column \'' + name + '\' is read-only')
+
+        for name, value in values.items():
+            if value is not None:
+                value = str(value)
+
+            column = self._column(name)
+            index = self._indexes.get(name)
+
+            for row in self._rows:
+                element = self._elements[row]
+
+                if value is None:
+                    element.attrib.pop(name, None)
+                else:
+                    element.set(name, value)
+
+                if index is not None:
+                    index[column[row]].discard(row)
+                    if not index[column[row]]:
+                        del index[column[row]]
+                    index.setdefault(value, set()).add(row)
+
+                column[row] = value
+                self._dirty.add(self._project_rows[row])
+
+    def save(self, projucer=None):
+        """
+        Saves every project with rows that have been updated. If the
+        *projucer* argument is present all files and resources will be
+        regenerated.
+
+        Args:
+            projucer: The path to the Projucer executable binary or app bundle
+                on mac, or a *Projucer* object.
+        """
+        for i in sorted(self._dirty):
+            self._projects[i].save(projucer)
+
+        self._dirty.clear()
+
+    def _append(self, project, exporter, configuration):
+        row = len(self._elements)
+        self._project_rows.append(project)
+        self._elements.append(configuration._xml)
+
+        for column in self._columns.values():
+            column.append(None)
+
+        self._columns['project'][row] = self._projects[project].path
+        self._columns['exporter'][row] = exporter.format
+
+        for name, value in configuration._xml.attrib.items():
+            self._column(name)[row] = value
+
+    def _column(self, name):
+        if name not in self._columns:
+            self._columns[name] = [None] * len(self._elements)
+        return self._columns[name]
+
+    def _index(self, name):
+        if name not in self._indexes:
+            index = dict()
+            for row, value in enumerate(self._column(name)):
+                index.setdefault(value, set()).add(row)
+            self._indexes[name] = index
+        return self._indexes[name]
+
+    def _view(self, rows):
+        view = copy.copy(self)
+        view._rows = sorted(rows)
+        view._row_set = set(view._rows)
+        return view
+
+
+class Registry(object):
+    """
+    A thread safe cache of *Project* and *Module* objects keyed by absolute
+    path, so that concurrent users of the same file share one instance rather
+    than each parsing their own copy.
+
+    Looking up a cached instance takes no lock, it only checks that the file
+    on disk is unchanged since the instance last read or wrote it, and
+    concurrent requests to load the same path wait for a single load. When
+    the file has been changed by someone else a cached *Module* is reloaded in
+    place. A cached *Project* is replaced by a new instance instead, as its
+    exporters and configurations refer to elements of its tree, and saving
+    the replaced instance raises **IOError** rather than losing the changes.
+
+    Shared instances should be treated as read-mostly. Writes from
+    *Module.version* and *Project.save()* are always serialized per file, but
+    any read-modify-save sequence on a shared instance should be wrapped in
+    *lock()*.
+    """
+    def __init__(self):
+        self._entries = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def project(self, path):
+        """Returns the shared *Project* for the project file at `path`."""
+        path = os.path.abspath(path)
+        return self._get(Project, path, path)
+
+    def module(self, path):
+        """Returns the shared *Module* for the module directory at `path`."""
+        path = os.path.abspath(path)
+        header = os.path.join(path, os.path.basename(path) + '.h')
+        return self._get(Module, path, header)
+
+    @contextlib.contextmanager
+    def lock(self, instance):
+        """
+        Returns a context manager that serializes writes to the file backing
+        `instance`, a *Project* or *Module*, across threads and processes.
+
+        On entry it yields an up to date instance for the file, so changes
+        made inside the block are applied to the current contents of the
+        file. That is `instance` itself, reloaded if it is a stale *Module*,
+        or the shared instance if `instance` is a stale *Project*.
+
+        e.g. ``with registry.lock(project) as project:``
+        """
+        if isinstance(instance, Module):
+            source = instance._header
+        else:
+            source = instance.path
+
+        with _file_lock(source):
+            if not instance._stamp.matches(source):
+                if isinstance(instance, Module):
+                    instance.reload()
+                else:
+                    instance = self.project(instance.path)
+            yield instance
+
+    def clear(self):
+        """Removes all cached instances."""
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, cls, path, source):
+        key = (cls, path)
+
+        # fast path, a single dict lookup is atomic so no lock is required
+        instance = self._entries.get(key)
+        if instance is not None and instance._stamp.matches(source):
+            return instance
+
+        # the read lock is taken before waiting on or starting a load, so a
+        # thread that holds the write lock is never left waiting on a loader
+        # that is blocked by it
+        with _file_lock(source, shared=True):
+            with self._lock:
+                instance = self._entries.get(key)
+                if instance is not None and instance._stamp.matches(source):
+                    return instance
+
+                pending = self._pending.get(key)
+                if pending is not None:
+                    is_loader = False
+                else:
+                    pending = self._pending[key] = _PendingLoad()
+                    is_loader = True
+
+            if not is_loader:
+                return pending.wait()
+
+            try:
+                if isinstance(instance, Module):
+                    instance.reload()
+                else:
+                    instance = cls(path)
+            except BaseException as error:
+                with self._lock:
+                    del self._pending[key]
+                pending.fail(error)
+                raise
+
+            with self._lock:
+                self._entries[key] = instance
+                del self._pending[key]
+            pending.succeed(instance)
+
+        return instance
+
+
+class _PendingLoad(object):
+    def __init__(self):
+        self._event = threading.Event()
+        self._instance = None
+        self._error = None
+
+    def succeed(self, instance):
+        self._instance = instance
+        self._event.set()
+
+    def fail(self, error):
+        self._error = error
+        self._event.set()
+
+    def wait(self):
+        self._event.wait()
+        if self._error is not None:
+            raise self._error
+        return self._instance
+
+
+# the coarsest modification time resolution of a supported filesystem (FAT)
+_TIMESTAMP_RESOLUTION = 2.0
+
+
+class _FileStamp(object):
+    def __init__(self, path):
+        stat = os.stat(path)
+        self._stat = _stat_key(stat)
+        self._digest = None
+
+        # a rewrite within the filesystem's timestamp resolution can leave the
+        # stat unchanged, so the contents of recently modified files are kept
+        if time.time() - stat.st_mtime < _TIMESTAMP_RESOLUTION:
+            self._digest = _file_digest(path)
+
+    def matches(self, path):
+        stat = os.stat(path)
+        if _stat_key(stat) != self._stat:
+            return False
+
+        if self._digest is not None:
+            if _file_digest(path) != self._digest:
+                return False
+
+            if time.time() - stat.st_mtime >= _TIMESTAMP_RESOLUTION:
+                self._digest = None
+
+        return True
+
+
+def _stat_key(stat):
+    return (stat.st_mtime_ns, stat.st_ctime_ns, stat.st_ino, stat.st_size)
+
+
+def _file_digest(path):
+    with open(path, 'rb') as file:
+        return hashlib.sha1(file.read()).digest()
+
+
+class _FileLock(object):
+    """
+    A reentrant readers-writer lock for one file, backed by an advisory lock
+    on the file so that other processes are excluded too. A thread holding the
+    write lock may also take the read lock, but not the other way around.
+    """
+    def __init__(self, path):
+        self._path = path
+        self._condition = threading.Condition(threading.Lock())
+        self._writer = None
+        self._writer_depth = 0
+        self._readers = {}
+        self._file = None
+
+    def acquire(self, shared):
+        thread = threading.current_thread()
+
+        with self._condition:
+            if self._writer is thread:
+                self._writer_depth += 1
+                return
+
+            if shared:
+                while self._writer is not None:
+                    self._condition.wait()
+
+                if not self._readers:
+                    self._lock_file(shared=True)
+                self._readers[thread] = self._readers.get(thread, 0) + 1
+            else:
+                if thread in self._readers:
+                    raise RuntimeError('Cannot write to \'' + self._path + '\' while reading it')
+
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+
+                self._lock_file(shared=False)
+                self._writer = thread
+                self._writer_depth = 1
+
+    def release(self):
+        thread = threading.current_thread()
+
+        with self._condition:
+            if self._writer is thread:
+                self._writer_depth -= 1
+                if self._writer_depth == 0:
+                    self._writer = None
+                    self._unlock_file()
+                    self._condition.notify_all()
+                return
+
+            self._readers[thread] -= 1
+            if self._readers[thread] == 0:
+                del self._readers[thread]
+                if not self._readers:
+                    self._unlock_file()
+                    self._condition.notify_all()
+
+    def _lock_file(self, shared):
+        file = open(self._path)
+        try:
+            _lock_file(file, shared)
+        except:
+            file.close()
+            raise
+        self._file = file
+
+    def _unlock_file(self):
+        _unlock_file(self._file)
+        self._file.close()
+        self._file = None
+
+
+# windows locks are mandatory, so rather than the contents a single byte far
+# beyond the end of the file is locked, which only blocks other lockers.
+# msvcrt has no shared locks, so readers in different processes exclude each
+# other on windows
+_MSVCRT_LOCK_OFFSET = 0x7fffffff
+
+
+def _lock_file(file, shared):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        return
+
+    file.seek(_MSVCRT_LOCK_OFFSET)
+    while True:
+        try:
+            # LK_LOCK gives up after 10 seconds, keep waiting like flock
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except (IOError, OSError) as error:
+            if error.errno != errno.EDEADLOCK:
+                raise
+
+
+def _unlock_file(file):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+        return
+
+    file.seek(_MSVCRT_LOCK_OFFSET)
+    msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# locks are only kept alive by their holders, so the paths of files that are
+# no longer being used don't accumulate for the life of the process
+_file_locks = weakref.WeakValueDictionary()
+_file_locks_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _file_lock(path, shared=False):
+    path = os.path.abspath(path)
+    with _file_locks_lock:
+        lock = _file_locks.get(path)
+        if lock is None:
+            lock = _file_locks[path] = _FileLock(path)
+
+    lock.acquire(shared)
+    try:
+        yield lock
+    finally:
+        lock.release()
+
+
+registry = Registry()
+"""The process wide *Registry* of shared *Project* and *Module* objects."""
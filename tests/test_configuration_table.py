@@ -0,0 +1,77 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import juce
+
+projects_dir = os.path.join(os.path.dirname(__file__), 'resources', 'projects')
+
+
+class TestConfigurationTableClass(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.paths = []
+        for name in ['first', 'second']:
+            path = os.path.join(self.temp_dir, name + '.jucer')
+            shutil.copy(os.path.join(projects_dir, 'test_project.jucer'), path)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_columns(self):
+        table = juce.ConfigurationTable(self.paths)
+        self.assertEqual(len(table), 8)
+        self.assertEqual(table.column('exporter').count('XCODE_MAC'), 4)
+        self.assertEqual(table.column('wholeProgramOptimisation').count(None), 6)
+        self.assertEqual(table.column('missing'), [None] * 8)
+
+    def test_duplicate_projects(self):
+        project = juce.Project(self.paths[0])
+        table = juce.ConfigurationTable([self.paths[0], project, os.path.relpath(self.paths[0])])
+        self.assertEqual(len(table), 4)
+        self.assertEqual(len(table.projects), 1)
+
+    def test_filter(self):
+        table = juce.ConfigurationTable(self.paths)
+        release = table.filter(name='Release')
+        self.assertEqual(len(release), 4)
+        self.assertEqual(len(release.filter(exporter='XCODE_MAC')), 2)
+        self.assertEqual(len(table.filter(name='Missing')), 0)
+        self.assertEqual(len(table.filter()), 8)
+
+        below = release.filter(optimisation=lambda value: int(value) < 3)
+        self.assertEqual(below.column('exporter'), ['XCODE_MAC', 'XCODE_MAC'])
+
+    def test_group_by(self):
+        table = juce.ConfigurationTable(self.paths)
+        groups = table.filter(exporter='VS2017').group_by('optimisation')
+        self.assertEqual(sorted(groups), ['1', '3'])
+        self.assertEqual(groups['3'].column('name'), ['Release', 'Release'])
+
+    def test_update(self):
+        table = juce.ConfigurationTable(self.paths)
+        table.filter(exporter='XCODE_MAC', name='Release').update(optimisation=3)
+        self.assertEqual(len(table.filter(optimisation='3')), 4)
+        self.assertEqual(len(table.filter(optimisation='2')), 0)
+
+        table.filter(exporter='VS2017', name='Release').update(optimisation=2)
+        self.assertEqual(len(table.filter(optimisation=2)), 2)
+        self.assertEqual(len(table.filter(optimisation=3)), 2)
+        self.assertEqual(len(table.filter(wholeProgramOptimisation=None)), 6)
+
+        with self.assertRaises(ValueError):
+            table.update(exporter='VS2017')
+
+        table.save()
+
+        for path in self.paths:
+            exporter = juce.Project(path).exporters[0]
+            optimisation = [config.optimisation for config in exporter.configurations]
+            self.assertEqual(optimisation, ['1', '3'])
+
+        exporter = juce.Project(self.paths[0]).exporters[1]
+        self.assertEqual(exporter.configurations[1].optimisation, '2')
@@ -0,0 +1,240 @@
+
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+from unittest import mock
+
+import juce
+
+resources_dir = os.path.join(os.path.dirname(__file__), 'resources')
+
+
+class TestRegistryClass(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.project_path = os.path.join(self.temp_dir, 'test_project.jucer')
+        self.module_path = os.path.join(self.temp_dir, 'test_valid_module')
+        shutil.copy(os.path.join(resources_dir, 'projects', 'test_project.jucer'), self.project_path)
+        shutil.copytree(os.path.join(resources_dir, 'modules', 'test_valid_module'), self.module_path)
+        self.registry = juce.Registry()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_shared_instances(self):
+        project = self.registry.project(self.project_path)
+        self.assertIs(project, self.registry.project(os.path.relpath(self.project_path)))
+        self.assertIs(self.registry.module(self.module_path), self.registry.module(self.module_path))
+
+    def test_shared_after_own_write(self):
+        project = self.registry.project(self.project_path)
+        project.save()
+        self.assertIs(project, self.registry.project(self.project_path))
+
+        module = self.registry.module(self.module_path)
+        module.version = '1.2.3'
+        self.assertIs(module, self.registry.module(self.module_path))
+
+    def test_revalidation(self):
+        module = self.registry.module(self.module_path)
+        juce.Module(self.module_path).version = '1.2.3.4'
+        self.assertIs(self.registry.module(self.module_path), module)
+        self.assertEqual(module.version, '1.2.3.4')
+
+    def test_same_size_rewrite(self):
+        module = self.registry.module(self.module_path)
+        header = module._header
+        stat = os.stat(header)
+
+        juce.Module(self.module_path).version = '9.9.9'
+        os.utime(header, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        self.assertEqual(os.stat(header).st_size, stat.st_size)
+        self.assertEqual(self.registry.module(self.module_path).version, '9.9.9')
+
+    def test_missing_file(self):
+        with self.assertRaises(IOError):
+            self.registry.module(os.path.join(resources_dir, 'modules', 'test_missing_header'))
+
+    def test_invalid_module(self):
+        path = os.path.join(resources_dir, 'modules', 'test_invalid_id')
+        with self.assertRaises(ValueError):
+            self.registry.module(path)
+        with self.assertRaises(ValueError):
+            self.registry.module(path)
+
+    def test_concurrent_loads(self):
+        barrier = threading.Barrier(8)
+        results = []
+        calls = []
+        init = juce.Project.__init__
+
+        def slow_init(project, path):
+            calls.append(path)
+            time.sleep(0.1)
+            init(project, path)
+
+        def load():
+            barrier.wait()
+            results.append(self.registry.project(self.project_path))
+
+        with mock.patch.object(juce.Project, '__init__', slow_init):
+            threads = [threading.Thread(target=load) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_serialized_writes(self):
+        active = []
+        overlaps = []
+        write = juce.ElementTree.ElementTree.write
+
+        def slow_write(tree, *args, **kwargs):
+            active.append(None)
+            if len(active) > 1:
+                overlaps.append(None)
+            time.sleep(0.01)
+            write(tree, *args, **kwargs)
+            active.pop()
+
+        project = self.registry.project(self.project_path)
+        errors = []
+
+        def save():
+            try:
+                project.save()
+            except Exception as error:
+                errors.append(error)
+
+        with mock.patch.object(juce.ElementTree.ElementTree, 'write', slow_write):
+            threads = [threading.Thread(target=save) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(overlaps, [])
+        self.assertEqual(errors, [])
+
+    def test_stale_project_save(self):
+        project = juce.Project(self.project_path)
+
+        outside = juce.Project(self.project_path)
+        outside._xml.set('version', '2.0.0')
+        outside.save()
+
+        with self.assertRaises(IOError):
+            project.save()
+        self.assertEqual(juce.Project(self.project_path).version, '2.0.0')
+
+    def test_stale_module_save(self):
+        module = juce.Module(self.module_path)
+        with open(module._header) as file:
+            contents = file.read()
+        with open(module._header, 'w') as file:
+            file.write(contents.replace('name:             name', 'name:             renamed'))
+
+        module.version = '4.0.0'
+
+        module = juce.Module(self.module_path)
+        self.assertEqual(module.version, '4.0.0')
+        self.assertEqual(module.name, 'renamed')
+
+    def test_stale_configuration_table(self):
+        project = self.registry.project(self.project_path)
+        table = juce.ConfigurationTable([project])
+        table.filter(name='Release').update(optimisation=0)
+
+        outside = juce.Project(self.project_path)
+        outside._xml.set('version', '2.0.0')
+        outside.save()
+
+        self.assertIsNot(self.registry.project(self.project_path), project)
+        with self.assertRaises(IOError):
+            table.save()
+
+    def test_lock_holder_lookup(self):
+        # a lookup by the holder of the write lock must not wait on a loader
+        # that is itself blocked on the lock
+        project = self.registry.project(self.project_path)
+        results = []
+
+        def writer():
+            with self.registry.lock(project):
+                outside = juce.Project(self.project_path)
+                outside._xml.set('version', '2.0.0')
+                outside._tree.write(self.project_path)
+
+                reader = threading.Thread(target=lambda: results.append(self.registry.project(self.project_path)))
+                reader.start()
+                time.sleep(0.1)
+                results.append(self.registry.project(self.project_path))
+            reader.join()
+
+        thread = threading.Thread(target=writer)
+        thread.daemon = True
+        thread.start()
+        thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(results), 2)
+        self.assertIs(results[0], results[1])
+        self.assertEqual(results[0].version, '2.0.0')
+
+    def test_concurrent_readers(self):
+        # readers share the lock, so a load isn't blocked by another load
+        with juce._file_lock(self.project_path, shared=True):
+            thread = threading.Thread(target=juce.Project, args=(self.project_path,))
+            thread.daemon = True
+            thread.start()
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+
+    def test_no_lost_update(self):
+        first = self.registry.project(self.project_path)
+        first.save()
+
+        second = self.registry.project(self.project_path)
+        with self.registry.lock(second) as second:
+            second._xml.set('version', '2.0.0')
+            second.save()
+
+        outside = juce.Project(self.project_path)
+        outside._xml.set('name', 'renamed')
+        outside.save()
+
+        with self.registry.lock(first) as current:
+            self.assertIsNot(current, first)
+            current._xml.set('companyName', 'other')
+            current.save()
+
+        project = juce.Project(self.project_path)
+        self.assertEqual(project.version, '2.0.0')
+        self.assertEqual(project.name, 'renamed')
+        self.assertEqual(project.companyName, 'other')
+
+    def test_lock_reloads_stale_instance(self):
+        module = self.registry.module(self.module_path)
+        juce.Module(self.module_path).version = '3.0.0'
+
+        with self.registry.lock(module) as locked:
+            self.assertIs(locked, module)
+            self.assertEqual(module.version, '3.0.0')
+            module.version = '3.0.1'
+
+        self.assertEqual(juce.Module(self.module_path).version, '3.0.1')
+
+    def test_file_locks_released(self):
+        project = self.registry.project(self.project_path)
+        project.save()
+        self.assertNotIn(self.project_path, juce._file_locks)